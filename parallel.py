@@ -0,0 +1,38 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this many items a process pool costs more than it saves.
+PARALLEL_MIN_ITEMS = 2000
+
+
+def resolve_workers(workers: int = None) -> int:
+    """
+    Number of worker processes to use; None means one per CPU core.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def map_chunked(func, items, workers: int = None, chunk_size: int = None,
+                min_items: int = None) -> list:
+    """
+    Applies func to every item and returns the results in input order.
+    Items are split into chunks and processed in a process pool; small inputs
+    (fewer than min_items, default PARALLEL_MIN_ITEMS) or workers=1 run serially
+    in this process.
+    func must be a module-level function so it can be pickled.
+    """
+    items = list(items)
+    if min_items is None:
+        min_items = PARALLEL_MIN_ITEMS
+    workers = resolve_workers(workers)
+    if workers == 1 or len(items) < min_items:
+        return [func(item) for item in items]
+
+    if not chunk_size:
+        # a few chunks per worker keeps the pool busy without much IPC overhead
+        chunk_size = max(1, -(-len(items) // (workers * 4)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items, chunksize=chunk_size))
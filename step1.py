@@ -3,6 +3,8 @@ import re
 import pandas as pd
 from datetime import datetime
 
+from store import assign_sections, import_dataframe
+
 
 def clean_latex(text: str) -> str:
     """
@@ -56,14 +58,19 @@ def parse_markdown_questions(md_path: str):
     return questions
 
 
-def convert_md_to_excel(md_path: str, output_path: str = None) -> str:
+def convert_md_to_excel(md_path: str, output_path: str = None, store_path: str = None) -> str:
     """
     Converts markdown to Excel. Returns the path of the generated .xlsx.
+    Each row gets an explicit Section ID (difficulty level); if store_path is given
+    the question store there is (re)populated with the same rows.
     """
     questions = parse_markdown_questions(md_path)
-    df = pd.DataFrame(questions)
+    df = pd.DataFrame(questions, columns=['Question No','Question','Type','Options','Answer','Explanation'])
     df.insert(0, 'Serial Number', range(1, len(df)+1))
-    df = df[['Serial Number','Question No','Question','Type','Options','Answer','Explanation']]
+    df.insert(1, 'Section', assign_sections(df['Question No']))
+
+    if store_path:
+        import_dataframe(df, store_path)
 
     if not output_path:
         ts = datetime.now().strftime('%Y%m%d_%H%M%S')
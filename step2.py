@@ -4,6 +4,8 @@ from pathlib import Path
 from openpyxl import load_workbook
 from datetime import datetime
 
+from store import load_dataframe, write_changes, export_xlsx
+
 
 def split_into_sections(pairs):
     sections, curr = [], {}
@@ -34,11 +36,10 @@ def clean_latex(s: str) -> str:
     return s.strip()
 
 
-def process_step2(ans_md_path: str, sol_md_path: str, input_xlsx: str, output_path: str = None) -> str:
+def parse_answer_key(ans_md_path: str):
     """
-    Reads answer-key .md, solution .md, merges into input_xlsx, writes to new Excel.
+    Answer-key .md → list of per-section {Question No: answer} dicts.
     """
-    # Parse answer key
     ans_txt = Path(ans_md_path).read_text(encoding='utf-8')
     ans_pairs = []
     for line in ans_txt.splitlines():
@@ -49,9 +50,13 @@ def process_step2(ans_md_path: str, sol_md_path: str, input_xlsx: str, output_pa
             m2 = re.match(r'^\s*(\d+)\.\s*(.+)$', line)
             if m2 and not re.fullmatch(r'[abcd]', m2.group(2), flags=re.IGNORECASE):
                 ans_pairs.append((int(m2.group(1)), m2.group(2).strip()))
-    answer_sections = split_into_sections(ans_pairs)
+    return split_into_sections(ans_pairs)
 
-    # Parse solutions
+
+def parse_solutions(sol_md_path: str):
+    """
+    Solutions .md → list of per-section {Question No: solution text} dicts.
+    """
     sol_txt = Path(sol_md_path).read_text(encoding='utf-8')
     sol_pairs, cur_q, cur_lines = [], None, []
     for line in sol_txt.splitlines(keepends=True):
@@ -65,7 +70,62 @@ def process_step2(ans_md_path: str, sol_md_path: str, input_xlsx: str, output_pa
             cur_lines.append(line)
     if cur_q is not None:
         sol_pairs.append((cur_q, ''.join(cur_lines).strip()))
-    solution_sections = split_into_sections(sol_pairs)
+    return split_into_sections(sol_pairs)
+
+
+def next_section_index(section, qn, prev_q, sec_idx) -> int:
+    """
+    0-based section index for a row: the explicit Section ID when it is numeric,
+    otherwise a new section whenever Question No resets to 1.
+    """
+    try:
+        return int(section) - 1
+    except (TypeError, ValueError):
+        return sec_idx + 1 if prev_q is not None and qn == 1 else sec_idx
+
+
+def merge_into_store(ans_md_path: str, sol_md_path: str, store_path: str) -> int:
+    """
+    Step 2 against the question store: merges answers and solutions by
+    (Section, Question No) and writes back only the cells that changed.
+    Returns the number of questions updated.
+    """
+    answer_sections = parse_answer_key(ans_md_path)
+    solution_sections = parse_solutions(sol_md_path)
+
+    before = load_dataframe(store_path)
+    df = before.copy()
+    prev_q, sec_idx = None, 0
+    for idx, row in df.iterrows():
+        try:
+            qn = int(row['Question No'])
+        except (TypeError, ValueError):
+            continue
+        sec_idx = next_section_index(row['Section'], qn, prev_q, sec_idx)
+        prev_q = qn
+        if not 0 <= sec_idx < min(len(answer_sections), len(solution_sections)):
+            continue
+        df.at[idx, 'Answer'] = answer_sections[sec_idx].get(qn, '')
+        df.at[idx, 'Explanation'] = clean_latex(solution_sections[sec_idx].get(qn, ''))
+    return write_changes(before, df, ['Answer', 'Explanation'], store_path)
+
+
+def process_step2(ans_md_path: str, sol_md_path: str, input_xlsx: str = None, output_path: str = None,
+                  store_path: str = None) -> str:
+    """
+    Reads answer-key .md, solution .md, merges into input_xlsx, writes to new Excel.
+    If store_path is given, the question store is merged instead (input_xlsx is not
+    read) and the Excel is exported from the updated store.
+    """
+    if store_path:
+        merge_into_store(ans_md_path, sol_md_path, store_path)
+        if not output_path:
+            ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+            output_path = os.path.join(os.path.dirname(store_path), f"2_{ts}.xlsx")
+        return export_xlsx(output_path, store_path)
+
+    answer_sections = parse_answer_key(ans_md_path)
+    solution_sections = parse_solutions(sol_md_path)
 
     # Load and merge
     wb = load_workbook(input_xlsx)
@@ -74,6 +134,8 @@ def process_step2(ans_md_path: str, sol_md_path: str, input_xlsx: str, output_pa
     q_col = hdr.index('Question No')+1
     ans_col = hdr.index('Answer')+1
     sol_col = hdr.index('Explanation')+1
+    # Explicit section IDs from Step 1; older sheets fall back to Question No resets
+    sec_col = hdr.index('Section')+1 if 'Section' in hdr else None
 
     prev_q, sec_idx = None, 0
     for row in range(2, ws.max_row+1):
@@ -82,8 +144,8 @@ def process_step2(ans_md_path: str, sol_md_path: str, input_xlsx: str, output_pa
             qn = int(val)
         except:
             continue
-        if prev_q is not None and qn == 1:
-            sec_idx += 1
+        sec = ws.cell(row, sec_col).value if sec_col else None
+        sec_idx = next_section_index(sec, qn, prev_q, sec_idx)
         prev_q = qn
         if sec_idx >= len(answer_sections):
             break
@@ -97,4 +159,4 @@ def process_step2(ans_md_path: str, sol_md_path: str, input_xlsx: str, output_pa
         base = os.path.dirname(input_xlsx)
         output_path = os.path.join(base, f"2_{ts}.xlsx")
     wb.save(output_path)
-    return output_path
\ No newline at end of file
+    return output_path
@@ -1,10 +1,13 @@
 import os
+import re
 import time
 import pandas as pd
 import openai
 from tqdm import tqdm
 from datetime import datetime
 
+from store import get_by_serial, update_question, load_dataframe, write_changes
+
 
 def build_prompt(sn, qn, qt, qtype, opts, ans, expl):
     system = (
@@ -39,42 +42,179 @@ def parse_response_and_flag(resp: str):
     return expl, flag
 
 
-def process_step3(input_xlsx: str, output_path: str = None, openai_key: str = None) -> str:
+def generate_explanation(row):
+    """
+    One LLM call for one question row; returns (Detailed Explanation, Flag).
+    """
+    sys, usr = build_prompt(
+        row['Serial Number'], row['Question No'], row['Question'],
+        row['Type'], row['Options'], row['Answer'], row['Explanation']
+    )
+    try:
+        res = openai.ChatCompletion.create(
+            model='gpt-3.5-turbo',
+            messages=[{'role':'system','content':sys},{'role':'user','content':usr}],
+            temperature=0.2, max_tokens=1200
+        )
+        raw = res.choices[0].message.content
+    except Exception as e:
+        raw = f"Error: {e}\nFlag: Yes"
+    return parse_response_and_flag(raw)
+
+
+def regenerate_question(serial: int, store_path: str, openai_key: str = None):
+    """
+    Single-row Step 3: regenerates one question from the store and writes it back.
+    Returns the updated row, or None if the Serial Number is not in the store.
+    """
+    if openai_key:
+        openai.api_key = openai_key
+    row = get_by_serial(serial, store_path)
+    if row is None:
+        return None
+    row['Detailed Explanation'], row['Flag'] = generate_explanation(row)
+    update_question(serial, {'Detailed Explanation': row['Detailed Explanation'], 'Flag': row['Flag']}, store_path)
+    return row
+
+
+# Triage defaults: an explanation this long with this many steps is treated as complete
+TRIAGE_MIN_CHARS = 200
+TRIAGE_MIN_STEPS = 2
+
+# Lines that open a solution step: "Step 1", "1.", "2)", "(ii)", bullets
+STEP_MARKER = re.compile(r'^\s*(?:step\s*\d+\s*[:.)-]?|\d+[.)](?!\d)|\(?[ivx]+\)|[-*•](?=\s))\s*', re.IGNORECASE | re.MULTILINE)
+
+
+def _text(val) -> str:
+    return str(val).strip() if pd.notna(val) else ''
+
+
+def split_steps(expl: str) -> list:
+    """
+    Splits an explanation into steps. With step markers, each marker opens a step
+    (lead-in lines join the first one); without markers, each non-blank line is a step.
+    """
+    lines = [ln.strip() for ln in _text(expl).splitlines() if ln.strip()]
+    if not any(STEP_MARKER.match(ln) for ln in lines):
+        return lines
+    steps, lead = [], []
+    for ln in lines:
+        if STEP_MARKER.match(ln):
+            steps.append([STEP_MARKER.sub('', ln, count=1)])
+        elif steps:
+            steps[-1].append(ln)
+        else:
+            lead.append(ln)
+    steps[0] = lead + steps[0]
+    return [' '.join(p for p in st if p) for st in steps]
+
+
+def count_steps(expl: str, count_lines: bool = False) -> int:
+    """
+    Number of steps per split_steps. Unmarked explanations count as 0 steps unless
+    count_lines=True, in which case each non-blank line counts.
+    """
+    if not count_lines and not STEP_MARKER.search(_text(expl)):
+        return 0
+    return len(split_steps(expl))
+
+
+def answer_is_valid(qtype, opts, ans) -> bool:
+    """
+    Answer must be present; for MCQs it must be one of the option letters.
+    """
+    ans = _text(ans)
+    if not ans or ans.lower() == 'nan':
+        return False
+    if _text(qtype) != 'MCQ':
+        return True
+    m = re.fullmatch(r'\(?\s*([a-z])\s*\)?', ans, flags=re.IGNORECASE)
+    letters = re.findall(r'\(\s*([a-z])\s*\)', _text(opts), flags=re.IGNORECASE)
+    return bool(m) and m.group(1).lower() in {l.lower() for l in letters}
+
+
+def is_complete_solution(row, min_chars: int = TRIAGE_MIN_CHARS, min_steps: int = TRIAGE_MIN_STEPS,
+                         require_answer: bool = True, count_lines: bool = False) -> bool:
+    """
+    True if the merged Explanation already reads as a full solution and needs no LLM call.
+    Step structure means explicit step markers unless count_lines=True.
+    """
+    expl = _text(row.get('Explanation'))
+    if len(expl) < min_chars or count_steps(expl, count_lines) < min_steps:
+        return False
+    if require_answer and not answer_is_valid(row.get('Type'), row.get('Options'), row.get('Answer')):
+        return False
+    return True
+
+
+def triage_rows(df: pd.DataFrame, **opts) -> pd.Series:
+    """
+    Boolean mask over df: True rows can be reformatted locally, False rows go to the LLM.
+    Keyword options are passed through to is_complete_solution.
+    """
+    return pd.Series([is_complete_solution(row, **opts) for _, row in df.iterrows()],
+                     index=df.index, dtype=bool)
+
+
+def reformat_explanation(expl: str) -> str:
+    """
+    Reformat-only path: relabels an existing solution as 'Step 1:', 'Step 2:', ...
+    """
+    return '\n'.join(f"Step {i}: {st}" for i, st in enumerate(split_steps(expl), 1))
+
+
+def apply_triage(df: pd.DataFrame, **opts) -> pd.Series:
+    """
+    Fills Detailed Explanation (reformatted) and Flag 'No' in place for rows that
+    pass triage. Returns the triage mask; df[~mask] still needs the LLM.
+    """
+    done = triage_rows(df, **opts)
+    df['Detailed Explanation'] = df['Detailed Explanation'].astype(object)
+    df['Flag'] = df['Flag'].astype(object)
+    for idx in df.index[done]:
+        df.at[idx, 'Detailed Explanation'] = reformat_explanation(df.at[idx, 'Explanation'])
+        df.at[idx, 'Flag'] = 'No'
+    return done
+
+
+def process_step3(input_xlsx: str = None, output_path: str = None, openai_key: str = None,
+                  store_path: str = None, triage: bool = False, **triage_opts) -> str:
     """
     Reads input_xlsx, calls OpenAI to generate Detailed Explanation & Flag, writes new Excel.
+    With triage=True, rows whose Explanation is already a complete solution are
+    reformatted locally instead (see triage_rows for the options).
+    If store_path is given, questions are read from the question store instead of
+    input_xlsx and only the changed Detailed Explanation/Flag cells are written back.
     """
     if openai_key:
         openai.api_key = openai_key
 
-    df = pd.read_excel(input_xlsx)
+    if store_path:
+        before = load_dataframe(store_path)
+        df = before.copy()
+    else:
+        df = pd.read_excel(input_xlsx)
     if 'Detailed Explanation' not in df.columns:
         df['Detailed Explanation'] = ''
     if 'Flag' not in df.columns:
         df['Flag'] = ''
 
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="Step 3"):  
-        sys, usr = build_prompt(
-            row['Serial Number'], row['Question No'], row['Question'],
-            row['Type'], row['Options'], row['Answer'], row['Explanation']
-        )
-        try:
-            res = openai.ChatCompletion.create(
-                model='gpt-3.5-turbo',
-                messages=[{'role':'system','content':sys},{'role':'user','content':usr}],
-                temperature=0.2, max_tokens=1200
-            )
-            raw = res.choices[0].message.content
-        except Exception as e:
-            raw = f"Error: {e}\nFlag: Yes"
-
-        expl, flag = parse_response_and_flag(raw)
+    pending = df
+    if triage:
+        pending = df[~apply_triage(df, **triage_opts)]
+
+    for idx, row in tqdm(pending.iterrows(), total=len(pending), desc="Step 3"):
+        expl, flag = generate_explanation(row)
         df.at[idx, 'Detailed Explanation'] = expl
         df.at[idx, 'Flag'] = flag
         time.sleep(1)
 
+    if store_path:
+        write_changes(before, df, ['Detailed Explanation', 'Flag'], store_path)
+
     if not output_path:
         ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-        base = os.path.dirname(input_xlsx)
+        base = os.path.dirname(store_path or input_xlsx)
         output_path = os.path.join(base, f"3_{ts}.xlsx")
     df.to_excel(output_path, index=False)
     return output_path
\ No newline at end of file
@@ -3,6 +3,9 @@ import re
 import pandas as pd
 from datetime import datetime
 
+from parallel import map_chunked
+from store import load_dataframe, write_changes
+
 
 def clean_latex(text: str) -> str:
     # fractions, inequalities, inline math cleanup
@@ -17,20 +20,36 @@ def clean_latex(text: str) -> str:
     return text.strip()
 
 
-def process_step4(input_xlsx: str, output_path: str = None) -> str:
+def process_step4(input_xlsx: str = None, output_path: str = None, workers: int = None,
+                  store_path: str = None) -> str:
     """
     Cleans LaTeX artifacts in Question, Explanation, and Detailed Explanation columns.
+    Large sheets are cleaned in chunks across `workers` processes (default: all cores);
+    pass workers=1 to force the serial path. If store_path is given, questions are
+    read from the question store instead of input_xlsx and only cells whose text
+    changed are written back.
     """
-    df = pd.read_excel(input_xlsx)
+    if store_path:
+        before = load_dataframe(store_path)
+        df = before.copy()
+    else:
+        df = pd.read_excel(input_xlsx)
 
-    columns_to_clean = ["Question", "Explanation", "Detailed Explanation"]
+    columns_to_clean = [c for c in ["Question", "Explanation", "Detailed Explanation"] if c in df.columns]
+    # Flatten all columns into one job list so a single pool serves every column
+    cells = []
     for col in columns_to_clean:
-        if col in df.columns:
-            df[col] = df[col].astype(str).apply(clean_latex)
+        cells.extend(df[col].astype(str).tolist())
+    cleaned = map_chunked(clean_latex, cells, workers=workers)
+    for i, col in enumerate(columns_to_clean):
+        df[col] = pd.Series(cleaned[i*len(df):(i+1)*len(df)], index=df.index, dtype=object)
+
+    if store_path:
+        write_changes(before, df, columns_to_clean, store_path)
 
     if not output_path:
         ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-        base = os.path.dirname(input_xlsx)
+        base = os.path.dirname(store_path or input_xlsx)
         output_path = os.path.join(base, f"final_{ts}.xlsx")
 
     df.to_excel(output_path, index=False)
@@ -5,6 +5,8 @@ import re
 import os
 from datetime import datetime
 
+from parallel import map_chunked
+
 # ─── 1) Core TeXifier: catches a/b, sqrt(...), 45°, pi, ^, _ ────────────────
 def texify_inline(s: str) -> str:
     s = re.sub(
@@ -39,81 +41,121 @@ ROMAN = ["I","II","III","IV","V","VI","VII","VIII","IX","X",
 def to_roman(n: int) -> str:
     return ROMAN[n-1] if 1 <= n <= len(ROMAN) else str(n)
 
-# ─── 3) Exporter: final Excel → questions.md ─────────────────────────────
-def process_step5(input_xlsx: str) -> str:
+# ─── 3) Per-question renderer (pure, so it can run in a worker process) ───
+def render_question(record) -> list:
     """
-    Reads the final Excel (Step 4 output) and emits a Markdown file grouping:
-      # Level of Difficulty I, II, …
-      ## Question N
-      (question text)
-      - option A
-      ...
-      ### Correct Answer
-      (Answer column)
-      #### Solution
-      (Detailed Explanation)
-    Returns the generated .md filepath.
+    Renders one question block from a (raw_q, question, options, answer, solution)
+    tuple of plain strings. Returns the Markdown lines, separator included.
     """
-    df = pd.read_excel(input_xlsx, engine="openpyxl")
-    df.columns = df.columns.str.strip()
+    raw_q, qtxt, opts, ans, sol = record
+    lines = []
+
+    # Question
+    lines.append(f"## Question {raw_q}")
+    lines.append("")
+    lines.append(wrap_math_in_text(qtxt))
+    lines.append("")
+
+    # Options (if any)
+    if opts:
+        for opt in re.split(r";\s*|\r?\n", opts):
+            o = opt.strip()
+            if not o:
+                continue
+            # strip bullets or numbering
+            o = re.sub(r"^[\-\*\d\.\)]\s*", "", o)
+            lines.append(f"- {wrap_math_in_text(o)}")
+        lines.append("")
+
+    # Correct Answer
+    lines.append("### Correct Answer")
+    lines.append(wrap_math_in_text(ans))
+    lines.append("")
+
+    # Solution / Detailed Explanation
+    if sol and sol.lower() not in ("nan", "none"):
+        lines.append("#### Solution")
+        lines.append("")
+        for ln in sol.splitlines():
+            ln = ln.strip()
+            if ln:
+                lines.append(wrap_math_in_text(ln))
+                lines.append("")
+
+    # Separator
+    lines.append("---")
+    lines.append("")
+    return lines
+
+# ─── 4) Whole-sheet renderer ──────────────────────────────────────────────
+def render_markdown(df: pd.DataFrame, workers: int = None) -> list:
+    """
+    Renders a workbook-shaped DataFrame to Markdown lines. Uses the Section column
+    for Level headings when present (Step 1 output onwards); otherwise starts a new
+    level whenever Question No resets to 1.
+    """
+    records = []
+    for _, row in df.iterrows():
+        opts = row.get("Options", "")
+        records.append((
+            str(row.get("Question No", "")).strip(),
+            str(row.get("Question", "")).strip(),
+            str(opts) if pd.notna(opts) and str(opts).strip() else "",
+            str(row.get("Answer", "")).strip(),
+            str(row.get("Detailed Explanation", "")).strip(),
+        ))
+    blocks = map_chunked(render_question, records, workers=workers)
+    sections = df["Section"].tolist() if "Section" in df.columns else [None] * len(df)
 
     lines = []
     section = 0
     prev_q = None
+    prev_sec = None
 
-    for _, row in df.iterrows():
-        raw_q = str(row.get("Question No", "")).strip()
+    for (raw_q, *_), sec, block in zip(records, sections, blocks):
         try:
             qno = int(raw_q)
         except:
             qno = None
 
+        if pd.notna(sec):
+            # Explicit section ID from Step 1
+            if sec != prev_sec:
+                section = int(sec)
+                lines.append(f"# Level of Difficulty {to_roman(section)}")
+                lines.append("")
+            prev_sec = sec
         # New level when question resets to 1 (or first row)
-        if prev_q is None or qno == 1:
+        elif prev_q is None or qno == 1:
             section += 1
             lines.append(f"# Level of Difficulty {to_roman(section)}")
             lines.append("")
         prev_q = qno
 
-        # Question
-        lines.append(f"## Question {raw_q}")
-        lines.append("")
-        qtxt = str(row.get("Question", "")).strip()
-        lines.append(wrap_math_in_text(qtxt))
-        lines.append("")
-
-        # Options (if any)
-        opts = row.get("Options", "")
-        if pd.notna(opts) and str(opts).strip():
-            for opt in re.split(r";\s*|\r?\n", str(opts)):
-                o = opt.strip()
-                if not o:
-                    continue
-                # strip bullets or numbering
-                o = re.sub(r"^[\-\*\d\.\)]\s*", "", o)
-                lines.append(f"- {wrap_math_in_text(o)}")
-            lines.append("")
+        lines.extend(block)
 
-        # Correct Answer
-        ans = str(row.get("Answer", "")).strip()
-        lines.append("### Correct Answer")
-        lines.append(wrap_math_in_text(ans))
-        lines.append("")
+    return lines
 
-        # Solution / Detailed Explanation
-        sol = str(row.get("Detailed Explanation", "")).strip()
-        if sol and sol.lower() not in ("nan", "none"):
-            lines.append("#### Solution")
-            lines.append("")
-            for ln in sol.splitlines():
-                ln = ln.strip()
-                if ln:
-                    lines.append(wrap_math_in_text(ln))
-                    lines.append("")
-
-        # Separator
-        lines.append("---")
-        lines.append("")
+# ─── 5) Exporter: final Excel → questions.md ─────────────────────────────
+def process_step5(input_xlsx: str, workers: int = None) -> str:
+    """
+    Reads the final Excel (Step 4 output) and emits a Markdown file grouping:
+      # Level of Difficulty I, II, …
+      ## Question N
+      (question text)
+      - option A
+      ...
+      ### Correct Answer
+      (Answer column)
+      #### Solution
+      (Detailed Explanation)
+    Large sheets are rendered in chunks across `workers` processes (default: all
+    cores); pass workers=1 to force the serial path.
+    Returns the generated .md filepath.
+    """
+    df = pd.read_excel(input_xlsx, engine="openpyxl")
+    df.columns = df.columns.str.strip()
+    lines = render_markdown(df, workers=workers)
 
     # Write out
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,236 @@
+import os
+import sqlite3
+import tempfile
+import uuid
+from contextlib import closing
+
+import pandas as pd
+
+from step5 import render_markdown
+
+# (db column, workbook column) in workbook order
+COLUMNS = [
+    ('serial', 'Serial Number'),
+    ('section', 'Section'),
+    ('question_no', 'Question No'),
+    ('question', 'Question'),
+    ('type', 'Type'),
+    ('options', 'Options'),
+    ('answer', 'Answer'),
+    ('explanation', 'Explanation'),
+    ('detailed_explanation', 'Detailed Explanation'),
+    ('flag', 'Flag'),
+]
+TO_DB = {xl: db for db, xl in COLUMNS}
+TO_XL = {db: xl for db, xl in COLUMNS}
+KEY_COLUMNS = ('Serial Number', 'Section', 'Question No')
+TEXT_COLUMNS = [xl for _, xl in COLUMNS if xl not in KEY_COLUMNS]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    serial INTEGER PRIMARY KEY,
+    section INTEGER,
+    question_no INTEGER,
+    question TEXT,
+    type TEXT,
+    options TEXT,
+    answer TEXT,
+    explanation TEXT,
+    detailed_explanation TEXT,
+    flag TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_section_qno ON questions (section, question_no);
+"""
+
+
+def assign_sections(question_nos):
+    """
+    Difficulty section (1-based) for each question: a new section starts whenever
+    Question No resets to 1. Non-numeric entries stay in the current section.
+    """
+    sections, section = [], 0
+    for val in question_nos:
+        try:
+            qn = int(val)
+        except (TypeError, ValueError):
+            qn = None
+        if section == 0 or qn == 1:
+            section += 1
+        sections.append(section)
+    return sections
+
+
+def new_store_path(directory: str = None) -> str:
+    """
+    Fresh database path for one upload / session, so stores are never shared.
+    """
+    return os.path.join(directory or tempfile.gettempdir(), f"zarle_{uuid.uuid4().hex}.db")
+
+
+def _connect(store_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(store_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _clean(val):
+    # NaN / numpy scalars → plain Python values sqlite understands
+    if val is None or (not isinstance(val, str) and pd.isna(val)):
+        return None
+    return val.item() if hasattr(val, 'item') else val
+
+
+def _to_row(rec) -> dict:
+    # Empty text cells come back as '' so rows behave like loaded DataFrames
+    row = {TO_XL[k]: rec[k] for k in rec.keys()}
+    return {k: ('' if v is None and k in TEXT_COLUMNS else v) for k, v in row.items()}
+
+
+def _same(a, b) -> bool:
+    a, b = _clean(a), _clean(b)
+    return a == b or (a in (None, '') and b in (None, ''))
+
+
+def import_dataframe(df: pd.DataFrame, store_path: str) -> int:
+    """
+    Replaces the store contents with df (a workbook from any step). Derives the
+    Section column from Question No resets where the sheet does not carry one.
+    Returns the number of rows written.
+    """
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    derived = pd.Series(assign_sections(df['Question No']), index=df.index)
+    df['Section'] = df['Section'].fillna(derived) if 'Section' in df.columns else derived
+    cols = [c for c in df.columns if c in TO_DB]
+    rows = [tuple(_clean(v) for v in rec) for rec in df[cols].itertuples(index=False)]
+    sql = "INSERT INTO questions ({}) VALUES ({})".format(
+        ', '.join(TO_DB[c] for c in cols), ', '.join('?' * len(cols)))
+    with closing(_connect(store_path)) as conn, conn:
+        conn.execute("DELETE FROM questions")
+        conn.executemany(sql, rows)
+    return len(rows)
+
+
+def import_xlsx(input_xlsx: str, store_path: str) -> int:
+    return import_dataframe(pd.read_excel(input_xlsx), store_path)
+
+
+def load_dataframe(store_path: str) -> pd.DataFrame:
+    """
+    Whole store as a workbook-shaped DataFrame, ordered by Serial Number.
+    Empty text cells are ''.
+    """
+    with closing(_connect(store_path)) as conn:
+        df = pd.read_sql_query("SELECT * FROM questions ORDER BY serial", conn)
+    df = df.rename(columns=TO_XL)
+    df[TEXT_COLUMNS] = df[TEXT_COLUMNS].astype(object).where(df[TEXT_COLUMNS].notna(), '')
+    return df
+
+
+def list_flagged(store_path: str) -> pd.DataFrame:
+    """
+    Questions whose Flag is 'Yes' (answer mismatch or generation error).
+    """
+    with closing(_connect(store_path)) as conn:
+        df = pd.read_sql_query(
+            "SELECT * FROM questions WHERE lower(trim(flag)) = 'yes' ORDER BY serial", conn)
+    return df.rename(columns=TO_XL)
+
+
+def count_questions(store_path: str) -> int:
+    with closing(_connect(store_path)) as conn:
+        return conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+
+def get_by_serial(serial: int, store_path: str):
+    """
+    One question as a dict keyed by workbook column names, or None.
+    """
+    with closing(_connect(store_path)) as conn:
+        rec = conn.execute("SELECT * FROM questions WHERE serial = ?", (int(serial),)).fetchone()
+    return _to_row(rec) if rec else None
+
+
+def get_question(section: int, question_no: int, store_path: str):
+    """
+    One question looked up by (Section, Question No), or None.
+    """
+    with closing(_connect(store_path)) as conn:
+        rec = conn.execute(
+            "SELECT * FROM questions WHERE section = ? AND question_no = ?",
+            (int(section), int(question_no))
+        ).fetchone()
+    return _to_row(rec) if rec else None
+
+
+def _fields(fields: dict) -> dict:
+    # Key columns are never rewritten
+    return {TO_DB[k]: _clean(v) for k, v in fields.items()
+            if k in TO_DB and k not in KEY_COLUMNS}
+
+
+def _update(fields: dict, where: str, key: tuple, store_path: str) -> bool:
+    fields = _fields(fields)
+    if not fields:
+        return False
+    sql = "UPDATE questions SET {} WHERE {}".format(', '.join(f"{c} = ?" for c in fields), where)
+    with closing(_connect(store_path)) as conn, conn:
+        cur = conn.execute(sql, (*fields.values(), *key))
+    return cur.rowcount > 0
+
+
+def update_question(serial: int, fields: dict, store_path: str) -> bool:
+    """
+    Updates the given workbook columns of one question in place. Returns False if
+    no row has that Serial Number.
+    """
+    return _update(fields, "serial = ?", (int(serial),), store_path)
+
+
+def update_by_key(section: int, question_no: int, fields: dict, store_path: str) -> bool:
+    """
+    Same as update_question, addressed by (Section, Question No).
+    """
+    return _update(fields, "section = ? AND question_no = ?", (int(section), int(question_no)), store_path)
+
+
+def update_many(updates, store_path: str) -> int:
+    """
+    Applies (serial, fields) pairs in a single transaction. Returns the number of
+    rows changed.
+    """
+    changed = 0
+    with closing(_connect(store_path)) as conn, conn:
+        for serial, fields in updates:
+            fields = _fields(fields)
+            if not fields:
+                continue
+            sql = "UPDATE questions SET {} WHERE serial = ?".format(', '.join(f"{c} = ?" for c in fields))
+            changed += conn.execute(sql, (*fields.values(), int(serial))).rowcount
+    return changed
+
+
+def write_changes(before: pd.DataFrame, after: pd.DataFrame, columns, store_path: str) -> int:
+    """
+    Writes back only the cells in `columns` that a step changed between two
+    snapshots of load_dataframe(store_path). Returns the number of rows updated.
+    """
+    updates = []
+    for idx in after.index:
+        fields = {c: after.at[idx, c] for c in columns if not _same(before.at[idx, c], after.at[idx, c])}
+        if fields:
+            updates.append((after.at[idx, 'Serial Number'], fields))
+    return update_many(updates, store_path)
+
+
+def export_xlsx(output_path: str, store_path: str) -> str:
+    load_dataframe(store_path).to_excel(output_path, index=False)
+    return output_path
+
+
+def export_md(output_path: str, store_path: str) -> str:
+    lines = render_markdown(load_dataframe(store_path))
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return output_path
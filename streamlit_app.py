@@ -7,9 +7,13 @@ import openai
 
 from step1 import convert_md_to_excel
 from step2 import process_step2
-from step3 import process_step3, build_prompt, parse_response_and_flag
+from step3 import (
+    process_step3, generate_explanation, apply_triage,
+    TRIAGE_MIN_CHARS, TRIAGE_MIN_STEPS, regenerate_question
+)
 from step4 import process_step4
 from step5 import process_step5
+import store
 
 # Load your API key from Streamlit secrets
 openai.api_key = os.environ.get("OPENAI_API_KEY")
@@ -136,8 +140,8 @@ with st.sidebar:
     )
     selected = option_menu(
         menu_title=None,
-        options=["Step 1","Step 2","Step 3","Step 4","Step 5"],
-        icons=["file-earmark-text","layers-half","robot","brush","file-earmark-code"],
+        options=["Step 1","Step 2","Step 3","Step 4","Step 5","Store"],
+        icons=["file-earmark-text","layers-half","robot","brush","file-earmark-code","database"],
         menu_icon="cast",
         default_index=0,
         orientation="vertical",
@@ -160,6 +164,23 @@ def _save_temp(uploaded, suffix):
     tmp.close()
     return tmp.name
 
+def _session_store():
+    # Each session gets its own store file; nothing is shared between users
+    return st.session_state.get("store_path")
+
+def _new_session_store():
+    st.session_state["store_path"] = store.new_store_path()
+    return st.session_state["store_path"]
+
+def _pick_input(label):
+    """Returns (store_path, None) to work on the session store, or (None, upload)."""
+    sp = _session_store()
+    if sp and st.radio("Input", ["Session question store", f"Upload {label}"], horizontal=True) \
+            == "Session question store":
+        st.caption(f"Working on this session's question store ({store.count_questions(sp)} questions).")
+        return sp, None
+    return None, st.file_uploader(f"Upload {label}", type="xlsx")
+
 # ─── Main App Logic ──────────────────────────────────────────────────────
 if selected == "Step 1":
     st.header("🧾 Step 1: Markdown → Excel")
@@ -169,7 +190,7 @@ if selected == "Step 1":
             st.warning("Please upload a Markdown file first.")
         else:
             path = _save_temp(md, ".md")
-            out = convert_md_to_excel(path)
+            out = convert_md_to_excel(path, store_path=_new_session_store())
             st.success("Conversion successful!")
             df = pd.read_excel(out)
             st.dataframe(df, use_container_width=True)
@@ -181,15 +202,17 @@ elif selected == "Step 2":
     c1, c2 = st.columns(2)
     md1 = c1.file_uploader("Upload Answer Key (.md)", type="md")
     md2 = c2.file_uploader("Upload Solutions (.md)", type="md")
-    x1 = st.file_uploader("Upload 1.xlsx", type="xlsx")
+    sp, x1 = _pick_input("1.xlsx")
     if st.button("Merge Files 🔄"):
-        if not (md1 and md2 and x1):
+        if not (md1 and md2 and (sp or x1)):
             st.warning("Please upload both .md files and the 1.xlsx file.")
         else:
             p1 = _save_temp(md1, ".md")
             p2 = _save_temp(md2, ".md")
-            p3 = _save_temp(x1, ".xlsx")
-            out = process_step2(p1, p2, p3)
+            if sp:
+                out = process_step2(p1, p2, store_path=sp)
+            else:
+                out = process_step2(p1, p2, _save_temp(x1, ".xlsx"))
             st.success("Merge complete!")
             df = pd.read_excel(out)
             st.dataframe(df, use_container_width=True)
@@ -198,55 +221,64 @@ elif selected == "Step 2":
 
 elif selected == "Step 3":
     st.header("🤖 Step 3: AI-Powered Explanations")
-    x2 = st.file_uploader("Upload 2.xlsx", type="xlsx")
-    if st.button("Generate Solutions ⚡️"):
-        if not x2:
-            st.warning("Please upload the 2.xlsx file.")
+    sp, x2 = _pick_input("2.xlsx")
+    with st.expander("🩺 Triage: skip rows that already have full solutions"):
+        use_triage = st.checkbox("Enable triage", value=False)
+        t1, t2, t3 = st.columns(3)
+        min_chars = t1.number_input("Min explanation length (chars)", min_value=0, value=TRIAGE_MIN_CHARS, step=50)
+        min_steps = t2.number_input("Min solution steps", min_value=1, value=TRIAGE_MIN_STEPS, step=1)
+        require_answer = t3.checkbox("Require valid answer / MCQ letter", value=True)
+        count_lines = st.checkbox("Count unmarked lines as steps", value=False)
+
+    # Load and triage on upload / settings change, so the split is visible before dispatch
+    df = pending = None
+    if sp or x2:
+        if sp:
+            before = store.load_dataframe(sp)
+            df = before.copy()
+            base = os.path.dirname(sp)
         else:
             path = _save_temp(x2, ".xlsx")
             df = pd.read_excel(path)
-            total = len(df)
+            base = os.path.dirname(path)
+        if 'Detailed Explanation' not in df.columns:
+            df['Detailed Explanation'] = ''
+        if 'Flag' not in df.columns:
+            df['Flag'] = ''
+        pending = df
+        if use_triage:
+            done = apply_triage(df, min_chars=int(min_chars), min_steps=int(min_steps),
+                                require_answer=require_answer, count_lines=count_lines)
+            pending = df[~done]
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Total rows", len(df))
+            m2.metric("Reformatted locally", int(done.sum()))
+            m3.metric("Sent to LLM", len(pending))
+            with st.expander("Preview rows handled locally"):
+                st.dataframe(df[done], use_container_width=True)
+
+    if st.button("Generate Solutions ⚡️"):
+        if df is None:
+            st.warning("Please upload the 2.xlsx file.")
+        else:
+            total = len(pending)
             progress = st.progress(0)
             status = st.empty()
 
-            # Ensure columns exist
-            # Before looping
-            if 'Detailed Explanation' not in df.columns:
-                df['Detailed Explanation'] = ''
-            if 'Flag' not in df.columns:
-                df['Flag'] = ''
-
-
-            for i, row in df.iterrows():
-                sys, usr = build_prompt(
-                    row['Serial Number'],
-                    row['Question No'],
-                    row['Question'],
-                    row['Type'],
-                    row['Options'],
-                    row['Answer'],
-                    row['Explanation']
-                )
-                try:
-                    res = openai.ChatCompletion.create(
-                        model="gpt-3.5-turbo",
-                        messages=[{"role":"system","content":sys}, {"role":"user","content":usr}],
-                        temperature=0.2,
-                        max_tokens=1200
-                    )
-                    raw = res.choices[0].message.content
-                except Exception as e:
-                    raw = f"Error: {e}\nFlag: Yes"
-
-                expl, flag = parse_response_and_flag(raw)
+            for n, (i, row) in enumerate(pending.iterrows(), 1):
+                expl, flag = generate_explanation(row)
                 df.at[i, 'Detailed Explanation'] = expl
                 df.at[i, 'Flag'] = flag
-                progress.progress((i+1)/total)
-                status.info(f"Processed {i+1}/{total} rows")
+                progress.progress(n/total)
+                status.info(f"Processed {n}/{total} rows")
 
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            out = os.path.join(os.path.dirname(path), f"3_{ts}.xlsx")
-            df.to_excel(out, index=False)
+            out = os.path.join(base, f"3_{ts}.xlsx")
+            if sp:
+                store.write_changes(before, df, ['Detailed Explanation', 'Flag'], sp)
+                store.export_xlsx(out, sp)
+            else:
+                df.to_excel(out, index=False)
 
             st.success("AI explanations generated!")
             st.dataframe(df, use_container_width=True)
@@ -255,13 +287,15 @@ elif selected == "Step 3":
 
 elif selected == "Step 4":  # Step 4
     st.header("🧼 Step 4: Final Cleanup")
-    x3 = st.file_uploader("Upload 3.xlsx", type="xlsx")
+    sp, x3 = _pick_input("3.xlsx")
     if st.button("Finalize ✔️"):
-        if not x3:
+        if not (sp or x3):
             st.warning("Please upload the 3.xlsx file.")
         else:
-            path = _save_temp(x3, ".xlsx")
-            out = process_step4(path)
+            if sp:
+                out = process_step4(store_path=sp)
+            else:
+                out = process_step4(_save_temp(x3, ".xlsx"))
             st.success("Final cleanup done! 🎉")
             df = pd.read_excel(out)
             st.dataframe(df, use_container_width=True)
@@ -269,7 +303,7 @@ elif selected == "Step 4":  # Step 4
                 st.download_button("🏁 Download Final Workbook", f, file_name=os.path.basename(out))
                 
 # ─── Step 5: Export to Markdown ──────────────────────────────────────────
-else:
+elif selected == "Step 5":
     st.header("📝 Step 5: Export to Markdown")
     x4 = st.file_uploader("Upload final Excel (from Step 4) after solving all the Flag issues", type="xlsx")
     if st.button("Generate questions.md 📄"):
@@ -291,3 +325,83 @@ else:
                     mime="text/markdown"
                 )
 
+# ─── Store: per-question lookup, edits & regeneration ────────────────────
+else:
+    st.header("🗄️ Question Store")
+
+    with st.expander("📥 Load a workbook into a new store"):
+        xs = st.file_uploader("Upload any step's .xlsx", type="xlsx")
+        if st.button("Load into store"):
+            if not xs:
+                st.warning("Please upload an .xlsx file first.")
+            else:
+                n = store.import_xlsx(_save_temp(xs, ".xlsx"), _new_session_store())
+                st.success(f"Loaded {n} questions.")
+
+    sp = _session_store()
+    if not sp:
+        st.info("No question store in this session yet — run Step 1 or load a workbook above.")
+        st.stop()
+    st.caption(f"{store.count_questions(sp)} questions in this session's store "
+               "(created by Step 1, updated by Steps 2–4)")
+
+    if "store_msg" in st.session_state:
+        st.success(st.session_state.pop("store_msg"))
+    # Bumped after a regeneration so the edit form is rebuilt with fresh values
+    rev = st.session_state.get("store_rev", 0)
+
+    flagged = store.list_flagged(sp)
+    if len(flagged):
+        st.subheader(f"🚩 Flagged questions ({len(flagged)})")
+        st.dataframe(flagged, use_container_width=True)
+
+    st.subheader("🔎 Find a question")
+    mode = st.radio("Look up by", ["Serial Number", "Section & Question No"], horizontal=True)
+    if mode == "Serial Number":
+        sn = st.number_input("Serial Number", min_value=1, value=1, step=1)
+        row = store.get_by_serial(sn, sp)
+    else:
+        c1, c2 = st.columns(2)
+        sec = c1.number_input("Section", min_value=1, value=1, step=1)
+        qn = c2.number_input("Question No", min_value=1, value=1, step=1)
+        row = store.get_question(sec, qn, sp)
+
+    if not row:
+        st.info("No question with that key in the store.")
+    else:
+        sn = row['Serial Number']
+        st.markdown(f"**Serial {sn}** · Section {row['Section']} · Question {row['Question No']} · {row['Type']}")
+        with st.form(f"edit_{sn}_{rev}"):
+            edits = {
+                'Question': st.text_area("Question", row['Question']),
+                'Options': st.text_area("Options", row['Options']),
+                'Answer': st.text_input("Answer", row['Answer']),
+                'Explanation': st.text_area("Explanation", row['Explanation']),
+                'Detailed Explanation': st.text_area("Detailed Explanation", row['Detailed Explanation'], height=250),
+                'Flag': st.text_input("Flag", row['Flag']),
+            }
+            if st.form_submit_button("💾 Save changes"):
+                store.update_question(sn, edits, sp)
+                st.success("Saved.")
+        if st.button("Regenerate with AI 🤖"):
+            with st.spinner("Regenerating…"):
+                new = regenerate_question(sn, sp)
+            if new is None:
+                st.warning("That question is no longer in the store.")
+            else:
+                st.session_state["store_msg"] = f"Regenerated question {sn} (Flag: {new['Flag']})."
+                st.session_state["store_rev"] = rev + 1
+                st.rerun()
+
+    st.subheader("📤 Export")
+    e1, e2 = st.columns(2)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if e1.button("Build workbook (.xlsx)"):
+        out = store.export_xlsx(os.path.join(tempfile.gettempdir(), f"store_{ts}.xlsx"), sp)
+        with open(out, "rb") as f:
+            e1.download_button("⬇️ Download workbook", f, file_name=os.path.basename(out))
+    if e2.button("Build questions.md"):
+        out_md = store.export_md(os.path.join(tempfile.gettempdir(), f"questions_{ts}.md"), sp)
+        with open(out_md, "rb") as f:
+            e2.download_button("⬇️ Download questions.md", f, file_name=os.path.basename(out_md),
+                               mime="text/markdown")
@@ -0,0 +1,74 @@
+import random
+
+import pandas as pd
+import pytest
+
+import parallel
+from parallel import map_chunked
+from step4 import clean_latex, process_step4
+from step5 import process_step5
+
+TOKENS = ['\\frac{1}{2}', '$x^2$', 'a/b', 'sqrt(3)', '45°', 'pi', 'x_1', '\\times',
+          '{', '}', '\\(y\\)', '\\pm', 'Step 1:', '\n', ' ', 'the', '=', '12']
+
+
+def _text(rng, n=25):
+    return ''.join(rng.choice(TOKENS) for _ in range(n))
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    rng = random.Random(0)
+    rows = []
+    for i in range(300):
+        rows.append({
+            'Serial Number': i + 1,
+            'Section': i // 100 + 1,
+            'Question No': i % 100 + 1,
+            'Question': _text(rng),
+            'Type': 'MCQ',
+            'Options': '; '.join(f"({l}) {_text(rng, 4)}" for l in 'abcd'),
+            'Answer': rng.choice('abcd'),
+            'Explanation': _text(rng),
+            'Detailed Explanation': '\n'.join(_text(rng, 10) for _ in range(3)),
+            'Flag': 'No',
+        })
+    path = tmp_path / 'in.xlsx'
+    pd.DataFrame(rows).to_excel(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def always_parallel(monkeypatch):
+    monkeypatch.setattr(parallel, 'PARALLEL_MIN_ITEMS', 0)
+
+
+def test_map_chunked_keeps_order():
+    rng = random.Random(1)
+    cells = [_text(rng) for _ in range(500)]
+    serial = [clean_latex(c) for c in cells]
+    assert map_chunked(clean_latex, cells, workers=2, min_items=0) == serial
+    assert map_chunked(clean_latex, cells, workers=2, chunk_size=7, min_items=0) == serial
+
+
+def test_map_chunked_small_input_is_serial(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("pool should not be created")
+    monkeypatch.setattr(parallel, 'ProcessPoolExecutor', no_pool)
+    assert map_chunked(str.upper, ['a', 'b'], workers=4) == ['A', 'B']
+    assert map_chunked(str.upper, ['a', 'b'], workers=1, min_items=0) == ['A', 'B']
+
+
+def test_step4_parallel_matches_serial(workbook, tmp_path, always_parallel):
+    serial = process_step4(workbook, str(tmp_path / 'serial.xlsx'), workers=1)
+    pooled = process_step4(workbook, str(tmp_path / 'pooled.xlsx'), workers=2)
+    pd.testing.assert_frame_equal(pd.read_excel(serial), pd.read_excel(pooled))
+
+
+def test_step5_parallel_matches_serial(workbook, always_parallel):
+    with open(process_step5(workbook, workers=1), 'rb') as f:
+        serial = f.read()
+    with open(process_step5(workbook, workers=2), 'rb') as f:
+        pooled = f.read()
+    assert serial == pooled
+    assert serial.count(b'# Level of Difficulty') == 3
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from step3 import (
+    answer_is_valid, apply_triage, count_steps, is_complete_solution,
+    reformat_explanation, split_steps, triage_rows,
+)
+
+OPTS = "(a) 10; (b) 12; (c) 14; (d) 16"
+MARKED = (
+    "Let the number be x.\n"
+    "Step 1: Twice the number plus four is 28, so 2x + 4 = 28.\n"
+    "Subtracting four from both sides gives 2x = 24.\n"
+    "Step 2: Dividing by two, x = 12, which matches option (b).\n"
+    "Step 3: Check: 2 × 12 + 4 = 28, as required by the question."
+)
+UNMARKED = (
+    "Twice the number plus four is 28, so 2x + 4 = 28 and 2x = 24.\n"
+    "Dividing both sides by two gives the value of the number, x = 12.\n"
+    "Checking: 2 × 12 + 4 = 28, so the answer is option (b), i.e. 12."
+)
+
+
+def _row(expl, ans='b', qtype='MCQ', opts=OPTS):
+    return {'Explanation': expl, 'Answer': ans, 'Type': qtype, 'Options': opts}
+
+
+def test_marked_steps_are_counted_and_relabelled_alike():
+    steps = split_steps(MARKED)
+    assert count_steps(MARKED) == len(steps) == 3
+    assert steps[0].startswith("Let the number be x. Twice")
+    out = reformat_explanation(MARKED).splitlines()
+    assert len(out) == 3
+    assert out[1] == "Step 2: Dividing by two, x = 12, which matches option (b)."
+
+
+def test_unmarked_lines_need_opt_in():
+    assert len(UNMARKED) >= 150
+    assert count_steps(UNMARKED) == 0
+    assert not is_complete_solution(_row(UNMARKED), min_chars=150)
+    assert count_steps(UNMARKED, count_lines=True) == 3
+    assert is_complete_solution(_row(UNMARKED), min_chars=150, count_lines=True)
+    # reformat splits the unmarked lines the same way they were counted
+    assert len(reformat_explanation(UNMARKED).splitlines()) == 3
+
+
+def test_negative_numbers_and_decimals_are_not_markers():
+    assert count_steps("-5 is too small\n3.5 is not an integer") == 0
+
+
+def test_answer_validation():
+    assert answer_is_valid('MCQ', OPTS, 'b')
+    assert answer_is_valid('MCQ', OPTS, '(B)')
+    assert not answer_is_valid('MCQ', OPTS, 'e')
+    assert not answer_is_valid('MCQ', OPTS, '')
+    assert not answer_is_valid('MCQ', OPTS, float('nan'))
+    assert answer_is_valid('Short Answer', '', '12')
+
+
+def test_apply_triage_fills_only_passing_rows():
+    df = pd.DataFrame([
+        _row(MARKED),
+        _row(MARKED, ans='e'),
+        _row("x = 12"),
+    ])
+    df['Detailed Explanation'] = float('nan')
+    df['Flag'] = float('nan')
+    assert triage_rows(df, min_chars=100).tolist() == [True, False, False]
+    assert triage_rows(df, min_chars=100, require_answer=False).tolist() == [True, True, False]
+
+    done = apply_triage(df, min_chars=100)
+    assert done.tolist() == [True, False, False]
+    assert df.at[0, 'Detailed Explanation'] == reformat_explanation(MARKED)
+    assert df.at[0, 'Flag'] == 'No'
+    assert df['Detailed Explanation'][1:].isna().all()
+
+
+def test_triage_rows_empty_frame():
+    df = pd.DataFrame(columns=['Explanation', 'Answer', 'Type', 'Options'])
+    assert triage_rows(df).empty
@@ -0,0 +1,152 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import step3
+import store
+from step1 import convert_md_to_excel
+from step2 import process_step2
+from step4 import process_step4
+
+QUESTIONS_MD = """1. What is 2 + 2?
+(a) 3
+(b) 4
+2. What is $\\frac{1}{2}$ of 10?
+(a) 5
+(b) 2
+1. What is 3 × 3?
+(a) 9
+(b) 6
+2. Name a prime.
+"""
+ANSWERS_MD = """1. (b)
+2. (a)
+1. (a)
+2. 7
+"""
+SOLUTIONS_MD = """1. Two plus two is four.
+2. Half of ten is $5$.
+1. Three times three is nine.
+2. Seven has no divisors other than 1 and itself.
+"""
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = {}
+    for name, text in [('q', QUESTIONS_MD), ('a', ANSWERS_MD), ('s', SOLUTIONS_MD)]:
+        paths[name] = tmp_path / f"{name}.md"
+        paths[name].write_text(text, encoding='utf-8')
+    return {k: str(v) for k, v in paths.items()}
+
+
+@pytest.fixture
+def db(sources, tmp_path):
+    path = store.new_store_path(str(tmp_path))
+    convert_md_to_excel(sources['q'], str(tmp_path / '1.xlsx'), store_path=path)
+    return path
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Records every (serial, fields) pair sent to the store."""
+    seen = []
+    real = store.update_many
+
+    def spy(updates, store_path):
+        updates = list(updates)
+        seen.extend(updates)
+        return real(updates, store_path)
+    monkeypatch.setattr(store, 'update_many', spy)
+    return seen
+
+
+def test_assign_sections():
+    assert store.assign_sections([1, 2, 3, 1, 2, 'x', 1]) == [1, 1, 1, 2, 2, 2, 3]
+
+
+def test_step1_writes_sections_to_workbook_and_store(db, tmp_path):
+    df = pd.read_excel(tmp_path / '1.xlsx')
+    assert df['Section'].tolist() == [1, 1, 2, 2]
+    assert store.count_questions(db) == 4
+    row = store.get_question(2, 1, db)
+    assert row['Serial Number'] == 3 and row['Question'] == 'What is 3 × 3?'
+    assert store.get_by_serial(4, db)['Type'] == 'Short Answer'
+    assert store.get_by_serial(99, db) is None
+
+
+def test_stores_are_independent(db, sources, tmp_path):
+    other = store.new_store_path(str(tmp_path))
+    assert other != db
+    store.import_dataframe(pd.DataFrame([{'Serial Number': 1, 'Question No': 1, 'Question': 'x'}]), other)
+    assert store.count_questions(other) == 1
+    assert store.count_questions(db) == 4
+
+
+def test_updates_never_touch_key_columns(db):
+    assert store.update_by_key(2, 1, {'Answer': 'a', 'Section': 9, 'Question No': 5}, db)
+    row = store.get_by_serial(3, db)
+    assert (row['Section'], row['Question No'], row['Answer']) == (2, 1, 'a')
+    assert not store.update_question(99, {'Answer': 'a'}, db)
+
+
+def test_step2_store_mode_merges_by_key_and_keeps_other_edits(db, sources, writes):
+    store.update_question(1, {'Question': 'Edited on the Store page'}, db)
+    out = process_step2(sources['a'], sources['s'], store_path=db)
+
+    row = store.get_question(2, 2, db)
+    assert row['Answer'] == '7'
+    assert row['Explanation'].startswith('Seven has no divisors')
+    assert store.get_by_serial(2, db)['Explanation'] == 'Half of ten is 5.'
+    assert store.get_by_serial(1, db)['Question'] == 'Edited on the Store page'
+    assert all(set(fields) <= {'Answer', 'Explanation'} for _, fields in writes)
+    assert pd.read_excel(out)['Answer'].astype(str).tolist() == ['b', 'a', 'a', '7']
+
+    # Re-running changes nothing, so nothing is written
+    writes.clear()
+    process_step2(sources['a'], sources['s'], store_path=db)
+    assert writes == []
+
+
+def test_step2_blank_section_cell_falls_back_to_resets(sources, tmp_path):
+    in_xlsx = str(tmp_path / '1.xlsx')
+    convert_md_to_excel(sources['q'], in_xlsx)
+    wb = load_workbook(in_xlsx)
+    ws = wb.active
+    ws.cell(4, [c.value for c in ws[1]].index('Section') + 1, value=None)
+    wb.save(in_xlsx)
+
+    out = process_step2(sources['a'], sources['s'], in_xlsx, str(tmp_path / '2.xlsx'))
+    assert pd.read_excel(out)['Answer'].astype(str).tolist() == ['b', 'a', 'a', '7']
+
+
+def test_step3_store_mode_writes_only_results(db, sources, monkeypatch, writes):
+    process_step2(sources['a'], sources['s'], store_path=db)
+    monkeypatch.setattr(step3, 'generate_explanation', lambda row: (f"Step 1: solved {row['Serial Number']}", 'No'))
+    monkeypatch.setattr(step3.time, 'sleep', lambda s: None)
+    writes.clear()
+
+    step3.process_step3(store_path=db)
+    assert store.get_by_serial(3, db)['Detailed Explanation'] == 'Step 1: solved 3'
+    assert all(set(fields) <= {'Detailed Explanation', 'Flag'} for _, fields in writes)
+
+
+def test_step4_store_mode_cleans_store_not_stale_upload(db, tmp_path, writes):
+    store.update_question(2, {'Detailed Explanation': 'Edited: $x \\times y$'}, db)
+    store.update_question(3, {'Detailed Explanation': 'Already clean'}, db)
+    writes.clear()
+
+    process_step4(store_path=db, workers=1)
+    assert store.get_by_serial(2, db)['Detailed Explanation'] == 'Edited: x × y'
+    assert [serial for serial, _ in writes if 'Detailed Explanation' in _] == [2]
+
+
+def test_regenerate_missing_serial_returns_none(db):
+    assert step3.regenerate_question(99, db) is None
+
+
+def test_export_md_uses_sections(db, tmp_path):
+    out = store.export_md(str(tmp_path / 'q.md'), db)
+    text = open(out, encoding='utf-8').read()
+    assert text.count('# Level of Difficulty') == 2
+    assert '# Level of Difficulty II' in text